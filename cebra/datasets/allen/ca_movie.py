@@ -47,6 +47,7 @@ import cebra.data
 from cebra.datasets import get_datapath
 from cebra.datasets import parametrize
 from cebra.datasets import register
+from cebra.datasets.allen import helper
 from cebra.datasets.allen import NUM_NEURONS
 from cebra.datasets.allen import SEEDS
 
@@ -65,9 +66,17 @@ class AllenCaMovieDataset(cebra.data.SingleSessionDataset):
 
     Args:
         num_neurons: The number of neurons to randomly sample from the stacked pseudomouse neurons. Choose from 10, 30, 50, 100, 200, 400, 600, 800, 900, 1000.
+            Neurons are sampled without replacement and kept in the order of the stacked pseudomouse.
         seed: The random seeds for sampling neurons.
         frame_feature_path: The path of the movie frame features.
+        pca: If ``True``, the sampled neurons are projected on their 32 leading principal components. The pseudomouse
+            is stacked in ``float32``, so the principal components are computed in single precision and differ
+            numerically from a fit on the ``float64`` source data. Default value is ``False``.
         load: The path to the preloaded neural data. If `None`, the neural data is constructed from the source. Default value is `None`.
+        dtype: The dtype to store the neural data in. ``torch.bfloat16`` halves the memory of the stored
+            data, at reduced precision. Samples are always returned as ``torch.float32``. Default value is ``torch.float32``.
+        share_memory: If ``True``, move the neural data to shared memory, so that data loader worker processes
+            access the same pages instead of receiving a copy each. Default value is ``False``.
 
     """
 
@@ -81,27 +90,36 @@ class AllenCaMovieDataset(cebra.data.SingleSessionDataset):
         "movie_one_image_stack.npz" / "testfeat.pth",
         pca=False,
         load=None,
+        dtype=torch.float32,
+        share_memory=False,
     ):
         super().__init__()
 
-        frame_feature = torch.load(frame_feature_path)
+        frame_feature = helper.load_frame_feature(frame_feature_path)
 
         if load is None:
-            pseudo_data = self._get_pseudo_mice(area)
+            pseudo_data = np.ascontiguousarray(self._get_pseudo_mice(area))
             sampler = Generator(PCG64(seed))
-            neurons_indices = sampler.choice(np.arange(pseudo_data.shape[0]),
-                                             size=num_neurons)
+            ## Sample without replacement; sorted indices keep the row gather
+            ## below close to sequential reads
+            neurons_indices = np.sort(
+                sampler.permutation(pseudo_data.shape[0])[:num_neurons])
+            sampled_neural = np.take(pseudo_data, neurons_indices, axis=0)
             if pca:
-                sampled_neural = pseudo_data[neurons_indices, :]
-                pca_ = PCA()
-                neural = pca_.fit_transform(sampled_neural.transpose(1,
-                                                                     0))[:, :32]
+                neural = helper.principal_components(sampled_neural,
+                                                     n_components=32,
+                                                     seed=seed)
             else:
-                neural = pseudo_data[neurons_indices, :].transpose(1, 0)
-            self.neural = torch.from_numpy(neural).float()
+                neural = sampled_neural.transpose(1, 0)
+            ## Store time-major and contiguous, so that __getitem__ gathers
+            ## whole rows instead of strided columns
+            self.neural = torch.from_numpy(
+                np.ascontiguousarray(neural, dtype=np.float32)).to(dtype)
         else:
             data = joblib.load(load)
-            self.neural = data["neural"]
+            self.neural = data["neural"].to(dtype)
+        if share_memory:
+            self.neural.share_memory_()
         self.index = self._get_index(frame_feature)
 
     def _get_index(self, frame_feature):
@@ -128,71 +146,7 @@ class AllenCaMovieDataset(cebra.data.SingleSessionDataset):
         """
 
         self.area = area
-        path = pathlib.Path(
-            _DEFAULT_DATADIR
-        ) / "allen" / "visual_drift" / "data" / "calcium_excitatory" / str(area)
-        list_mice = path.glob("*.mat")
-        exp_containers = [int(file.stem) for file in list_mice]
-
-        ## Load summary file
-        summary = pd.read_csv(
-            pathlib.Path(_DEFAULT_DATADIR) / "allen" / "data_summary.csv")
-        ## Filter excitatory neurons in V1
-        area_filtered = summary[(summary["exp"].isin(exp_containers)) &
-                                (summary["target"] == area) &
-                                ~(summary["cre_line"].str.contains("SSt")) &
-                                ~(summary["cre_line"].str.contains("Pvalb")) &
-                                ~(summary["cre_line"].str.contains("Vip"))]
-
-        def _convert_to_nums(string):
-            return list(
-                map(
-                    int,
-                    string.replace("\n", "").replace("[",
-                                                     "").replace("]",
-                                                                 "").split(),
-                ))
-
-        ## Pseudo V1
-        pseudo_mouse = []
-        for exp_container in set(area_filtered["exp"]):
-            neurons = summary[summary["exp"] == exp_container]["neurons"]
-            sessions = summary[summary["exp"] == exp_container]["session_type"]
-            seq_sessions = np.array(list(sessions)).argsort()
-            common_neurons = set.intersection(
-                set(_convert_to_nums(neurons.iloc[0])),
-                set(_convert_to_nums(neurons.iloc[1])),
-                set(_convert_to_nums(neurons.iloc[2])),
-            )
-            indices1 = [
-                _convert_to_nums(neurons.iloc[0]).index(x)
-                for x in common_neurons
-            ]
-            indices2 = [
-                _convert_to_nums(neurons.iloc[1]).index(x)
-                for x in common_neurons
-            ]
-            indices3 = [
-                _convert_to_nums(neurons.iloc[2]).index(x)
-                for x in common_neurons
-            ]
-            indices1.sort()
-            indices2.sort()
-            indices3.sort()
-            indices = [indices1, indices2, indices3]
-            matfile = pathlib.Path(
-                _DEFAULT_DATADIR
-            ) / "allen" / "visual_drift" / "data" / "calcium_excitatory" / str(
-                area) / f"{exp_container}.mat"
-            traces = scipy.io.loadmat(matfile)
-            for n, i in enumerate(seq_sessions):
-                session = traces["filtered_traces_days_events"][n, 0][
-                    indices[i], :]
-                pseudo_mouse.append(session)
-
-        pseudo_mouse = np.concatenate(pseudo_mouse)
-
-        return pseudo_mouse
+        return helper.build_pseudo_mice(area)
 
     def __len__(self):
         return self.neural.size(0)
@@ -206,9 +160,7 @@ class AllenCaMovieDataset(cebra.data.SingleSessionDataset):
         return self.neural.size(1)
 
     def __getitem__(self, index):
-        index = self.expand_index(index)
-
-        return self.neural[index].transpose(2, 1)
+        return helper.gather_windows(self.neural, index, self.offset)
 
 
 @parametrize("allen-movie1-ca-{num_neurons}-{seed}-preload",
@@ -37,7 +37,6 @@ import pathlib
 import h5py
 import joblib
 import numpy as np
-import pandas as pd
 import scipy.io
 import torch
 from numpy.random import Generator
@@ -48,6 +47,7 @@ import cebra.data
 from cebra.datasets import get_datapath
 from cebra.datasets import parametrize
 from cebra.datasets import register
+from cebra.datasets.allen import helper
 from cebra.datasets.allen import NUM_NEURONS
 from cebra.datasets.allen import SEEDS
 from cebra.datasets.allen import SEEDS_DISJOINT
@@ -78,6 +78,10 @@ class AllenCaMoviesDataset(cebra.data.SingleSessionDataset):
         split_flag: The split to load. Choose between `train` and `test`.
         seed: The random seeds for sampling neurons.
         preload: The path to the preloaded neural data. If `None`, the neural data is constructed from the source. Default value is `None`.
+        dtype: The dtype to store the neural data in. ``torch.bfloat16`` halves the memory of the stored
+            data, at reduced precision. Samples are always returned as ``torch.float32``. Default value is ``torch.float32``.
+        share_memory: If ``True``, move the neural data to shared memory, so that data loader worker processes
+            access the same pages instead of receiving a copy each. Default value is ``False``.
 
     """
 
@@ -90,12 +94,16 @@ class AllenCaMoviesDataset(cebra.data.SingleSessionDataset):
         seed,
         test_repeat,
         preload=None,
+        dtype=torch.float32,
+        share_memory=False,
     ):
         super().__init__()
         self.num_neurons = num_neurons
         self.seed = seed
         self.split_flag = split_flag
         self.test_repeat = test_repeat
+        self.dtype = dtype
+        self.share_memory = share_memory
         frame_feature = self._get_video_features(num_movie)
         if preload is None:
             pseudo_mice = self._get_pseudo_mice(cortex, num_movie)
@@ -104,11 +112,13 @@ class AllenCaMoviesDataset(cebra.data.SingleSessionDataset):
             self._split(pseudo_mice, frame_feature)
         else:
             data = joblib.load(preload)
-            self.neural = data["neural"]
+            self.neural = data["neural"].to(dtype)
             if split_flag == "train":
                 self.index = frame_feature.repeat(9, 1)
             else:
                 self.index = frame_feature.repeat(1, 1)
+            if share_memory:
+                self.neural.share_memory_()
 
     def _get_video_features(self, num_movie="one"):
         """Return behavior labels.
@@ -123,13 +133,15 @@ class AllenCaMoviesDataset(cebra.data.SingleSessionDataset):
         frame_feature_path = pathlib.Path(
             _DEFAULT_DATADIR
         ) / "allen" / "features" / "allen_movies" / "vit_base" / "8" / f"movie_{num_movie}_image_stack.npz" / "testfeat.pth"
-        frame_feature = torch.load(frame_feature_path)
+        frame_feature = helper.load_frame_feature(frame_feature_path)
         return frame_feature
 
     def _sample_neurons(self, pseudo_mice):
         """Randomly sample the specified number of neurons.
 
         The random sampling of the neurons specified by the `seed` and `num_neurons`.
+        Neurons are sampled without replacement, and the returned indices are sorted
+        so that gathering the sampled rows reads the pseudomouse data in order.
 
         Args:
             pseudo_mice: The pseudomouse data.
@@ -137,8 +149,8 @@ class AllenCaMoviesDataset(cebra.data.SingleSessionDataset):
         """
 
         sampler = Generator(PCG64(self.seed))
-        neurons_indices = sampler.choice(np.arange(pseudo_mice.shape[0]),
-                                         size=self.num_neurons)
+        neurons_indices = np.sort(
+            sampler.permutation(pseudo_mice.shape[0])[:self.num_neurons])
         return neurons_indices
 
     def _split(self, pseudo_mice, frame_feature):
@@ -153,7 +165,7 @@ class AllenCaMoviesDataset(cebra.data.SingleSessionDataset):
 
         if self.split_flag == "train":
             neural = np.delete(
-                pseudo_mice[self.neurons_indices],
+                np.take(pseudo_mice, self.neurons_indices, axis=0),
                 np.arange(
                     (self.test_repeat - 1) * self.movie_len,
                     self.test_repeat * self.movie_len,
@@ -162,16 +174,22 @@ class AllenCaMoviesDataset(cebra.data.SingleSessionDataset):
             )
             self.index = frame_feature.repeat(9, 1)
         elif self.split_flag == "test":
-            neural = pseudo_mice[
+            neural = np.take(
+                pseudo_mice[:, (self.test_repeat - 1) *
+                            self.movie_len:self.test_repeat * self.movie_len],
                 self.neurons_indices,
-                (self.test_repeat - 1) * self.movie_len:self.test_repeat *
-                self.movie_len,
-            ]
+                axis=0,
+            )
             self.index = frame_feature.repeat(1, 1)
         else:
             raise ValueError("split_flag should be either train or test")
 
-        self.neural = torch.from_numpy(neural.T).float()
+        ## Store time-major and contiguous, so that __getitem__ gathers
+        ## whole rows instead of strided columns
+        self.neural = torch.from_numpy(
+            np.ascontiguousarray(neural.T, dtype=np.float32)).to(self.dtype)
+        if self.share_memory:
+            self.neural.share_memory_()
 
     def _get_pseudo_mice(self, area, num_movie):
         """Construct pseudomouse neural dataset.
@@ -184,75 +202,7 @@ class AllenCaMoviesDataset(cebra.data.SingleSessionDataset):
 
         """
 
-        path = pathlib.Path(
-            _DEFAULT_DATADIR
-        ) / "allen" / "visual_drift" / "data" / "calcium_excitatory" / str(area)
-        list_mice = path.glob("*.mat")
-        exp_containers = [int(file.stem) for file in list_mice]
-        ## Load summary file
-        summary = pd.read_csv(
-            pathlib.Path(_DEFAULT_DATADIR) / "allen" / "data_summary.csv")
-        ## Filter excitatory neurons in V1
-        area_filtered = summary[(summary["exp"].isin(exp_containers)) &
-                                (summary["target"] == area) &
-                                ~(summary["cre_line"].str.contains("SSt")) &
-                                ~(summary["cre_line"].str.contains("Pvalb")) &
-                                ~(summary["cre_line"].str.contains("Vip"))]
-
-        def _convert_to_nums(string):
-            return list(
-                map(
-                    int,
-                    string.replace("\n", "").replace("[",
-                                                     "").replace("]",
-                                                                 "").split(),
-                ))
-
-        ## Pseudo V1
-        pseudo_mouse = []
-        for exp_container in set(area_filtered["exp"]):
-            neurons = summary[summary["exp"] == exp_container]["neurons"]
-            sessions = summary[summary["exp"] == exp_container]["session_type"]
-            seq_sessions = np.array(list(sessions)).argsort()
-            common_neurons = set.intersection(
-                set(_convert_to_nums(neurons.iloc[0])),
-                set(_convert_to_nums(neurons.iloc[1])),
-                set(_convert_to_nums(neurons.iloc[2])),
-            )
-            indices1 = [
-                _convert_to_nums(neurons.iloc[0]).index(x)
-                for x in common_neurons
-            ]
-            indices2 = [
-                _convert_to_nums(neurons.iloc[1]).index(x)
-                for x in common_neurons
-            ]
-            indices3 = [
-                _convert_to_nums(neurons.iloc[2]).index(x)
-                for x in common_neurons
-            ]
-            indices1.sort()
-            indices2.sort()
-            indices3.sort()
-            indices = [indices1, indices2, indices3]
-            matfile = pathlib.Path(
-                _DEFAULT_DATADIR
-            ) / "allen" / "visual_drift" / "data" / "calcium_excitatory" / str(
-                area) / f"{exp_container}.mat"
-            traces = scipy.io.loadmat(matfile)
-            for n, i in enumerate(seq_sessions):
-                session = traces["filtered_traces_days_events"][n, 0][
-                    indices[i], :]
-                pseudo_mouse.append(session)
-
-        pseudo_mouse = np.concatenate(pseudo_mouse)
-
-        return pseudo_mouse
-
-        pseudo_mouse = np.vstack(
-            [get_neural_data(num_movie, mice) for mice in list_mice])
-
-        return pseudo_mouse
+        return helper.build_pseudo_mice(area)
 
     def __len__(self):
         return self.neural.size(0)
@@ -266,9 +216,7 @@ class AllenCaMoviesDataset(cebra.data.SingleSessionDataset):
         return self.neural.size(1)
 
     def __getitem__(self, index):
-        index = self.expand_index(index)
-
-        return self.neural[index].transpose(2, 1)
+        return helper.gather_windows(self.neural, index, self.offset)
 
 
 @parametrize(
@@ -296,17 +244,31 @@ class AllenCaMoviesDisjointDataset(AllenCaMoviesDataset,
         split_flag: The split to load. Choose between `train` and `test`.
         seed: The random seeds for sampling neurons.
         group: The index of the group among disjoint sets of the sampled neurons.
+        dtype: The dtype to store the neural data in. ``torch.bfloat16`` halves the memory of the stored
+            data, at reduced precision. Samples are always returned as ``torch.float32``. Default value is ``torch.float32``.
+        share_memory: If ``True``, move the neural data to shared memory, so that data loader worker processes
+            access the same pages instead of receiving a copy each. Default value is ``False``.
 
     """
 
-    def __init__(self, num_movie, cortex, group, num_neurons, split_flag, seed,
-                 test_repeat):
+    def __init__(self,
+                 num_movie,
+                 cortex,
+                 group,
+                 num_neurons,
+                 split_flag,
+                 seed,
+                 test_repeat,
+                 dtype=torch.float32,
+                 share_memory=False):
         super(AllenCaMoviesDataset, self).__init__()
         self.num_neurons = num_neurons
         self.seed = seed
         self.split_flag = split_flag
         self.test_repeat = test_repeat
         self.group = group
+        self.dtype = dtype
+        self.share_memory = share_memory
         frame_feature = self._get_video_features(num_movie)
         pseudo_mice = self._get_pseudo_mice(cortex, num_movie)
         self.movie_len = int(pseudo_mice.shape[1] / 10)
@@ -317,6 +279,8 @@ class AllenCaMoviesDisjointDataset(AllenCaMoviesDataset,
         """Randomly sample disjoint neurons.
 
         The sampled two groups of 400 neurons are non-overlapping.
+        The returned indices are sorted, so that gathering the sampled rows reads the
+        pseudomouse data in order.
 
         Args:
             pseudo_mice: The pseudomouse dataset.
@@ -325,8 +289,13 @@ class AllenCaMoviesDisjointDataset(AllenCaMoviesDataset,
 
         sampler = Generator(PCG64(self.seed))
         permuted_neurons = sampler.permutation(pseudo_mice.shape[0])
-        return np.array_split(permuted_neurons,
-                              2)[self.group][:self.num_neurons]
+        ## The first group holds the larger half, as with np.array_split
+        half = (len(permuted_neurons) + 1) // 2
+        if self.group == 0:
+            group_neurons = permuted_neurons[:half]
+        else:
+            group_neurons = permuted_neurons[half:]
+        return np.sort(group_neurons[:self.num_neurons])
 
     def _get_pseudo_mice(self, area, num_movie):
         """Construct pseudomouse neural dataset.
@@ -344,7 +313,6 @@ class AllenCaMoviesDisjointDataset(AllenCaMoviesDataset,
         list_mice = path.glob("*")
 
         def _get_neural_data(num_movie, mat_file):
-            mat = scipy.io.loadmat(mat_file)
             if num_movie == "one":
                 mat_index = None
                 mat_key = "united_traces_days_events"
@@ -357,6 +325,7 @@ class AllenCaMoviesDisjointDataset(AllenCaMoviesDataset,
             else:
                 raise ValueError("num_movie should be one, two or three")
 
+            mat = scipy.io.loadmat(mat_file, variable_names=[mat_key])
             if mat_index is not None:
                 events = mat[mat_key][mat_index[0], mat_index[1]]
             else:
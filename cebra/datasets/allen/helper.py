@@ -0,0 +1,379 @@
+#
+# CEBRA: Consistent EmBeddings of high-dimensional Recordings using Auxiliary variables
+# © Mackenzie W. Mathis & Steffen Schneider (v0.4.0+)
+# Source code:
+# https://github.com/AdaptiveMotorControlLab/CEBRA
+#
+# Please see LICENSE.md for the full license document:
+# https://github.com/AdaptiveMotorControlLab/CEBRA/blob/main/LICENSE.md
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Helpers shared by the Allen pseudomouse Ca datasets.
+
+References:
+    *Deitch, Daniel, Alon Rubin, and Yaniv Ziv. "Representational drift in the mouse visual cortex." Current biology 31.19 (2021): 4327-4339.
+    *https://github.com/zivlab/visual_drift
+
+"""
+
+import functools
+import hashlib
+import os
+import pathlib
+import re
+import tempfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+import h5py
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.io
+import scipy.linalg
+import torch
+from sklearn.decomposition import PCA
+
+import cebra.data
+from cebra.datasets import get_datapath
+
+_DEFAULT_DATADIR = get_datapath()
+
+## Maps the brackets and line breaks of the neuron id lists stored in
+## ``data_summary.csv`` to whitespace.
+_NEURON_IDS_TABLE = str.maketrans({"[": " ", "]": " ", "\n": " "})
+
+
+def convert_to_nums(string: str) -> np.ndarray:
+    """Parse a neuron id list of ``data_summary.csv``, e.g. ``"[1 2\\n 3]"``."""
+    return np.fromstring(string.translate(_NEURON_IDS_TABLE).strip(),
+                         sep=" ",
+                         dtype=np.int64)
+
+
+## Cre lines of the inhibitory neurons, excluded from the pseudomice
+_INHIBITORY_CRE_LINES = re.compile("SSt|Pvalb|Vip")
+
+
+@functools.lru_cache(maxsize=None)
+def load_summary() -> Tuple[pd.DataFrame, Dict[int, pd.DataFrame]]:
+    """Load the summary of the experiment containers of *Deitch et al. (2021).
+
+    The summary is parsed once per process and shared by all pseudomouse datasets,
+    so the returned data frames must not be modified.
+
+    Returns:
+        The summary with an additional boolean ``inhibitory`` column marking the
+        inhibitory cre lines, and the rows of the summary grouped by experiment
+        container.
+    """
+    summary = pd.read_csv(
+        pathlib.Path(_DEFAULT_DATADIR) / "allen" / "data_summary.csv")
+    summary["inhibitory"] = summary["cre_line"].str.contains(
+        _INHIBITORY_CRE_LINES, na=False)
+    return summary, dict(iter(summary.groupby("exp")))
+
+
+@functools.lru_cache(maxsize=8)
+def load_frame_feature(path: pathlib.Path) -> torch.Tensor:
+    """Load the features of the movie frames.
+
+    The features are loaded once per process and shared by all datasets using them,
+    so the returned tensor must not be modified in place.
+
+    Args:
+        path: The path of the movie frame features.
+
+    Returns:
+        The feature of each movie frame.
+    """
+    return torch.load(path, map_location="cpu")
+
+
+def load_sessions(matfile: pathlib.Path, rows: list) -> list:
+    """Load the selected neurons of each session from a calcium events ``.mat`` file.
+
+    MATLAB v7.3 files are HDF5 files, from which only the selected rows are read.
+    Older files are read with :py:func:`scipy.io.loadmat`, restricted to the
+    ``filtered_traces_days_events`` variable.
+
+    Args:
+        matfile: The ``.mat`` file of an experiment container.
+        rows: The sorted indices of the neurons to load for each session.
+
+    Returns:
+        A list with the ``(len(rows[n]), num_frames)`` events of each session ``n``.
+    """
+    key = "filtered_traces_days_events"
+    rows = [np.asarray(session_rows, dtype=np.intp) for session_rows in rows]
+    if h5py.is_hdf5(matfile):
+        with h5py.File(matfile, "r") as file:
+            ## MATLAB arrays are column-major, so h5py exposes them transposed
+            sessions = file[key][()].T
+            return [
+                file[sessions[n, 0]][:, session_rows].T
+                for n, session_rows in enumerate(rows)
+            ]
+    traces = scipy.io.loadmat(matfile, variable_names=[key])[key]
+    return [
+        traces[n, 0][session_rows, :] for n, session_rows in enumerate(rows)
+    ]
+
+
+def _file_signature(file: pathlib.Path) -> str:
+    """Identify a file by its name, modification time and size."""
+    stat = file.stat()
+    return f"{file.name}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _load_cache(cache: pathlib.Path) -> Optional[np.ndarray]:
+    """Memory-map an array from the disk cache.
+
+    Args:
+        cache: The ``.npy`` file of the cached array.
+
+    Returns:
+        The read-only array, or ``None`` if the cache is missing or cannot be read.
+    """
+    try:
+        return np.load(cache, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+
+def _save_cache(cache: pathlib.Path, array: np.ndarray) -> bool:
+    """Save an array to the disk cache, if possible.
+
+    The array is written to a temporary file in the cache directory, which is then
+    renamed, so that concurrent readers never see a partially written cache. The
+    file gets the permissions of a regular file created under the current umask,
+    so that the cache in a shared data root is readable by other users.
+
+    Args:
+        cache: The ``.npy`` file to save the array to.
+        array: The array to save.
+
+    Returns:
+        Whether the array was saved, e.g. ``False`` on a read-only data root.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    temporary = None
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache.parent,
+                                         suffix=".tmp",
+                                         delete=False) as file:
+            temporary = pathlib.Path(file.name)
+            np.save(file, array)
+        os.chmod(temporary, 0o666 & ~umask)
+        os.replace(temporary, cache)
+    except OSError:
+        if temporary is not None:
+            temporary.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def cached_array(cache_dir: pathlib.Path, name: str,
+                 sources: List[pathlib.Path],
+                 build: Callable[[], np.ndarray]) -> np.ndarray:
+    """Build an array, or memory-map it from the disk cache if it was built before.
+
+    The cache is keyed on the name, modification time and size of the source
+    files, so that changed sources are not served from a stale cache. If the
+    cache cannot be read or written, the array is built and kept in memory.
+
+    Args:
+        cache_dir: The directory of the cached arrays.
+        name: The prefix of the cache file name.
+        sources: The files the array is built from.
+        build: Build the array from the sources.
+
+    Returns:
+        The memory-mapped, read-only array, or the built array if it is not cached.
+    """
+    key = hashlib.md5("|".join(
+        _file_signature(file) for file in sources).encode()).hexdigest()
+    cache = cache_dir / f"{name}_{key}.npy"
+    array = _load_cache(cache)
+    if array is not None:
+        return array
+
+    array = build()
+    if _save_cache(cache, array):
+        cached = _load_cache(cache)
+        if cached is not None:
+            return cached
+    return array
+
+
+@functools.lru_cache(maxsize=None)
+def build_pseudo_mice(area: str) -> np.ndarray:
+    """Construct the pseudomouse calcium events of a visual cortical area.
+
+    Stack the excitatory neurons from the multiple mice and construct a psuedomouse neural dataset of the specified visual cortical area.
+    The neurons which were recorded in all of the sessions A, B, C are included.
+
+    The stacked array is cached on disk and memory-mapped, and the mapping is shared by
+    all datasets of a process, so the returned array must not be modified. The cache
+    is keyed on the modification time and size of the source files; if it cannot be
+    written, the array is kept in memory instead.
+
+    Args:
+        area: The visual cortical area to sample the neurons. Possible options: VISp, VISpm, VISam, VISal, VISl, VISrl.
+
+    Returns:
+        The ``(neurons, frames)`` calcium events of the pseudomouse.
+    """
+    path = pathlib.Path(
+        _DEFAULT_DATADIR
+    ) / "allen" / "visual_drift" / "data" / "calcium_excitatory" / str(area)
+    list_mice = sorted(path.glob("*.mat"))
+    exp_containers = [int(file.stem) for file in list_mice]
+
+    summary_file = pathlib.Path(_DEFAULT_DATADIR) / "allen" / "data_summary.csv"
+    return cached_array(
+        pathlib.Path(get_datapath("allen/cache")), f"pseudo_{area}",
+        [summary_file] + list_mice,
+        functools.partial(_stack_pseudo_mice, area, exp_containers))
+
+
+def _stack_pseudo_mice(area: str, exp_containers: List[int]) -> np.ndarray:
+    """Stack the neurons recorded in all sessions of the given experiment containers.
+
+    Args:
+        area: The visual cortical area to sample the neurons.
+        exp_containers: The experiment containers with calcium events of the area.
+
+    Returns:
+        The ``(neurons, frames)`` calcium events of the pseudomouse.
+    """
+    ## Load summary file
+    summary, summary_by_exp = load_summary()
+    ## Filter excitatory neurons in V1
+    area_filtered = summary[(summary["exp"].isin(exp_containers)) &
+                            (summary["target"] == area) &
+                            ~summary["inhibitory"]]
+
+    ## Pseudo V1
+    containers = []
+    for exp_container in set(area_filtered["exp"]):
+        neurons = summary_by_exp[exp_container]["neurons"]
+        sessions = summary_by_exp[exp_container]["session_type"]
+        seq_sessions = np.argsort(sessions.to_numpy(), kind="stable")
+        neuron_ids = [convert_to_nums(neurons.iloc[i]) for i in range(3)]
+        common_neurons = np.intersect1d(
+            np.intersect1d(neuron_ids[0], neuron_ids[1], assume_unique=True),
+            neuron_ids[2],
+            assume_unique=True,
+        )
+        ## Sorted positions of the common neurons in each session
+        indices = [
+            np.flatnonzero(np.isin(ids, common_neurons, assume_unique=True))
+            for ids in neuron_ids
+        ]
+        matfile = pathlib.Path(
+            _DEFAULT_DATADIR
+        ) / "allen" / "visual_drift" / "data" / "calcium_excitatory" / str(
+            area) / f"{exp_container}.mat"
+        containers.append((matfile, [indices[i] for i in seq_sessions]))
+
+    ## Load the containers in parallel threads and fill the stacked
+    ## sessions into a single pre-allocated array, in container order
+    num_rows = sum(
+        len(session_rows) for _, rows in containers for session_rows in rows)
+    loaded = joblib.Parallel(n_jobs=-1, prefer="threads",
+                             return_as="generator")(
+                                 joblib.delayed(load_sessions)(matfile, rows)
+                                 for matfile, rows in containers)
+    pseudo_mouse = None
+    row = 0
+    for sessions in loaded:
+        for session in sessions:
+            if pseudo_mouse is None:
+                pseudo_mouse = np.empty((num_rows, session.shape[1]),
+                                        dtype=np.float32)
+            pseudo_mouse[row:row + len(session)] = session
+            row += len(session)
+    if pseudo_mouse is None or num_rows == 0:
+        raise ValueError(
+            f"No neurons recorded in all sessions were found for area {area}.")
+    return pseudo_mouse
+
+
+def principal_components(neural: np.ndarray, n_components: int,
+                         seed: int) -> np.ndarray:
+    """Project neural data on its leading principal components.
+
+    With fewer neurons than frames, the components are the leading eigenvectors of
+    the small ``(neurons, neurons)`` covariance matrix, so neither a transposed copy
+    of the data nor a decomposition of the ``(frames, neurons)`` matrix is needed.
+    Otherwise, a randomized PCA is fit on the frames.
+
+    Args:
+        neural: The ``(neurons, frames)`` neural data.
+        n_components: The maximum number of components to keep.
+        seed: The random seed of the randomized PCA.
+
+    Returns:
+        The ``(frames, n_components)`` projection, ordered by decreasing explained variance.
+    """
+    num_neurons, num_frames = neural.shape
+    n_components = min(n_components, num_neurons, num_frames)
+    if num_frames <= num_neurons:
+        return PCA(n_components=n_components,
+                   svd_solver="randomized",
+                   random_state=seed).fit_transform(neural.T)
+
+    ## Center in the precision of the input, so that the centered copy is not
+    ## larger than the data itself
+    centered = np.subtract(neural,
+                           neural.mean(axis=1, keepdims=True, dtype=np.float64),
+                           dtype=np.result_type(neural.dtype, np.float32))
+    covariance = centered @ centered.T / (num_frames - 1)
+    _, components = scipy.linalg.eigh(
+        covariance,
+        subset_by_index=[num_neurons - n_components, num_neurons - 1])
+    components = components[:, ::-1]
+    ## Fix the sign of each component for determinism: as in sklearn's PCA
+    ## (since 1.5), the largest loading of each component is positive
+    signs = np.sign(components[np.abs(components).argmax(axis=0),
+                               np.arange(n_components)])
+    return centered.T @ (components * signs)
+
+
+def gather_windows(neural: torch.Tensor, index: torch.Tensor,
+                   offset: cebra.data.Offset) -> torch.Tensor:
+    """Gather the windows of neural data centered on the given indices.
+
+    Equivalent to ``neural[dataset.expand_index(index)].transpose(2, 1)``, but the
+    windows are gathered from a strided ``(windows, neurons, window)`` view of the
+    data, so that the samples are returned contiguous and without an intermediate
+    ``(batch, window, neurons)`` copy.
+
+    Args:
+        neural: The ``(frames, neurons)`` neural data.
+        index: The indices of the samples to gather.
+        offset: The offset of the model the samples are used for.
+
+    Returns:
+        The ``(len(index), neurons, len(offset))`` samples as ``torch.float32``.
+    """
+    num_frames, num_neurons = neural.shape
+    windows = neural.as_strided(
+        (num_frames - len(offset) + 1, num_neurons, len(offset)),
+        (neural.stride(0), neural.stride(1), neural.stride(0)),
+    )
+    index = torch.clamp(index, offset.left, num_frames - offset.right)
+    return torch.index_select(windows, 0, index - offset.left).float()
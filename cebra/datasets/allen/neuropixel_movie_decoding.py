@@ -106,6 +106,22 @@ class AllenNeuropixelMovieDecoding120HzCorticesDataset(
         data = joblib.load(path)
         return data
 
+    def _sample_neurons(self, pseudo_mice):
+        """Randomly sample the specified number of neurons.
+
+        The random sampling of the neurons specified by the `seed` and `num_neurons`.
+        Neurons are sampled with replacement, in the order they are drawn.
+
+        Args:
+            pseudo_mice: The pseudomouse data.
+
+        """
+
+        sampler = Generator(PCG64(self.seed))
+        neurons_indices = sampler.choice(np.arange(pseudo_mice.shape[0]),
+                                         size=self.num_neurons)
+        return neurons_indices
+
     def _split(self, pseudo_mice, frame_feature):
         """Split the dataset into train and test set.
 
@@ -88,15 +88,14 @@ class SingleSessionAllenCa(cebra.data.SingleSessionDataset):
         pca: bool = False,
     ):
         self.path = _SINGLE_SESSION_CA[session_id]
-        traces = scipy.io.loadmat(self.path)
+        traces = scipy.io.loadmat(
+            self.path, variable_names=["filtered_traces_days_events"])
+        events = traces["filtered_traces_days_events"][0, 0]
         if pca:
             pca_ = PCA()
-            neural = pca_.fit_transform(
-                traces["filtered_traces_days_events"][0,
-                                                      0].transpose(1,
-                                                                   0))[:, :32]
+            neural = pca_.fit_transform(events.transpose(1, 0))[:, :32]
         else:
-            neural = traces["filtered_traces_days_events"][0, 0].transpose(1, 0)
+            neural = events.transpose(1, 0)
         self.neural = torch.from_numpy(neural).float()
         frame_feature = torch.load(frame_feature_path)
         self.index = frame_feature.repeat(10, 1)
@@ -143,15 +142,14 @@ class SingleSessionAllenCa(cebra.data.SingleSessionDataset):
         pca: bool = False,
     ):
         self.path = _SINGLE_SESSION_CA[session_id]
-        traces = scipy.io.loadmat(self.path)
+        traces = scipy.io.loadmat(
+            self.path, variable_names=["filtered_traces_days_events"])
+        events = traces["filtered_traces_days_events"][0, 0]
         if pca:
             pca_ = PCA()
-            neural = pca_.fit_transform(
-                traces["filtered_traces_days_events"][0,
-                                                      0].transpose(1,
-                                                                   0))[:, :32]
+            neural = pca_.fit_transform(events.transpose(1, 0))[:, :32]
         else:
-            neural = traces["filtered_traces_days_events"][0, 0].transpose(1, 0)
+            neural = events.transpose(1, 0)
 
         self.neural = torch.from_numpy(neural).float()
         frame_feature = torch.load(frame_feature_path)
@@ -232,15 +230,14 @@ class SingleSessionAllenCaDecoding(cebra.data.SingleSessionDataset):
         pca: bool = False,
     ):
         self.path = _SINGLE_SESSION_CA[session_id]
-        traces = scipy.io.loadmat(self.path)
+        traces = scipy.io.loadmat(
+            self.path, variable_names=["filtered_traces_days_events"])
+        events = traces["filtered_traces_days_events"][0, 0]
         if pca:
             pca_ = PCA()
-            neural = pca_.fit_transform(
-                traces["filtered_traces_days_events"][0,
-                                                      0].transpose(1,
-                                                                   0))[:, :32]
+            neural = pca_.fit_transform(events.transpose(1, 0))[:, :32]
         else:
-            neural = traces["filtered_traces_days_events"][0, 0].transpose(1, 0)
+            neural = events.transpose(1, 0)
 
         test_idx = np.arange(900 * repeat_no, 900 * (repeat_no + 1))
         train_idx = np.delete(np.arange(9000), test_idx)
@@ -286,7 +283,8 @@ class SingleSessionAllenCaDecodingLeave2Out(cebra.data.SingleSessionDataset):
         "movie_one_image_stack.npz" / "testfeat.pth",
     ):
         self.path = _SINGLE_SESSION_CA[session_id]
-        traces = scipy.io.loadmat(self.path)
+        traces = scipy.io.loadmat(
+            self.path, variable_names=["filtered_traces_days_events"])
         neural = traces["filtered_traces_days_events"][0, 0].transpose(1, 0)
 
         valid_idx = np.arange(900 * repeat_no, 900 * (repeat_no + 1))
@@ -391,15 +389,14 @@ class SingleSessionAllenCaDecoding(cebra.data.SingleSessionDataset):
         pca: bool = False,
     ):
         self.path = _SINGLE_SESSION_CA[session_id]
-        traces = scipy.io.loadmat(self.path)
+        traces = scipy.io.loadmat(
+            self.path, variable_names=["filtered_traces_days_events"])
+        events = traces["filtered_traces_days_events"][0, 0]
         if pca:
             pca_ = PCA()
-            neural = pca_.fit_transform(
-                traces["filtered_traces_days_events"][0,
-                                                      0].transpose(1,
-                                                                   0))[:, :32]
+            neural = pca_.fit_transform(events.transpose(1, 0))[:, :32]
         else:
-            neural = traces["filtered_traces_days_events"][0, 0].transpose(1, 0)
+            neural = events.transpose(1, 0)
 
         test_idx = np.arange(900 * repeat_no, 900 * (repeat_no + 1))
         train_idx = np.delete(np.arange(9000), test_idx)
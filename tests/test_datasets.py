@@ -139,6 +139,178 @@ def test_allen():
         break
 
 
+@pytest.mark.parametrize(
+    "string,expected",
+    [["[1 2 3]", [1, 2, 3]], ["[ 10  2\n 300]", [10, 2, 300]],
+     ["[1\n 2]\n", [1, 2]], ["[]", []], ["[ \n ]", []]],
+)
+def test_allen_convert_to_nums(string, expected):
+    from cebra.datasets.allen import helper
+
+    neuron_ids = helper.convert_to_nums(string)
+    assert neuron_ids.dtype == np.int64
+    assert np.array_equal(neuron_ids, expected)
+
+
+@pytest.mark.parametrize("hdf5", [False, True])
+def test_allen_load_sessions(tmp_path, hdf5):
+    import h5py
+    import scipy.io
+
+    from cebra.datasets.allen import helper
+
+    key = "filtered_traces_days_events"
+    rng = np.random.default_rng(0)
+    sessions = [rng.random((num_neurons, 20)) for num_neurons in (5, 7, 6)]
+    rows = [[0, 3], [1, 2, 6], []]
+
+    matfile = tmp_path / "container.mat"
+    if hdf5:
+        ## MATLAB v7.3 stores the (3, 1) cell array and its (neurons, frames)
+        ## elements column-major, i.e. transposed
+        with h5py.File(matfile, "w") as file:
+            references = [
+                file.create_dataset(f"session{n}", data=session.T).ref
+                for n, session in enumerate(sessions)
+            ]
+            file.create_dataset(key,
+                                data=np.array([references]),
+                                dtype=h5py.ref_dtype)
+    else:
+        cell = np.empty((3, 1), dtype=object)
+        for n, session in enumerate(sessions):
+            cell[n, 0] = session
+        scipy.io.savemat(matfile, {key: cell, "other": np.zeros((4, 4))})
+
+    loaded = helper.load_sessions(matfile, rows)
+    assert len(loaded) == len(sessions)
+    for session, session_rows, events in zip(sessions, rows, loaded):
+        assert events.shape == (len(session_rows), session.shape[1])
+        assert np.array_equal(events, session[session_rows])
+
+
+def test_allen_cached_array(tmp_path):
+    from cebra.datasets.allen import helper
+
+    source = tmp_path / "source.mat"
+    source.write_bytes(b"0" * 16)
+    cache_dir = tmp_path / "cache"
+    expected = np.arange(12, dtype=np.float32).reshape(3, 4)
+    builds = []
+
+    def _build():
+        builds.append(None)
+        return expected.copy()
+
+    ## A miss builds the array and writes a cache readable by other users
+    array = helper.cached_array(cache_dir, "test", [source], _build)
+    assert np.array_equal(array, expected)
+    assert len(builds) == 1
+    (cache,) = cache_dir.iterdir()
+    umask = os.umask(0)
+    os.umask(umask)
+    assert cache.stat().st_mode & 0o777 == 0o666 & ~umask
+
+    ## A hit memory-maps the cache without building
+    array = helper.cached_array(cache_dir, "test", [source], _build)
+    assert isinstance(array, np.memmap)
+    assert not array.flags.writeable
+    assert np.array_equal(array, expected)
+    assert len(builds) == 1
+
+    ## Changing the modification time or the size of a source changes the key
+    os.utime(source, ns=(0, 0))
+    helper.cached_array(cache_dir, "test", [source], _build)
+    assert len(builds) == 2
+    source.write_bytes(b"0" * 32)
+    os.utime(source, ns=(0, 0))
+    helper.cached_array(cache_dir, "test", [source], _build)
+    assert len(builds) == 3
+    assert len(list(cache_dir.iterdir())) == 3
+
+    ## An unreadable cache is rebuilt
+    for cache in cache_dir.iterdir():
+        cache.write_bytes(b"corrupted")
+    array = helper.cached_array(cache_dir, "test", [source], _build)
+    assert np.array_equal(array, expected)
+    assert len(builds) == 4
+
+    ## If the cache cannot be written, the array is kept in memory
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_bytes(b"")
+    array = helper.cached_array(not_a_dir, "test", [source], _build)
+    assert not isinstance(array, np.memmap)
+    assert np.array_equal(array, expected)
+    assert len(builds) == 5
+
+
+@pytest.mark.parametrize("total_neurons,num_neurons",
+                         [[1000, 400], [999, 400], [801, 400], [7, 400]])
+@pytest.mark.parametrize("seed", [111, 222])
+def test_allen_disjoint_sample_neurons(total_neurons, num_neurons, seed):
+    from numpy.random import Generator
+    from numpy.random import PCG64
+
+    from cebra.datasets.allen import ca_movie_decoding
+
+    pseudo_mice = np.empty((total_neurons, 1))
+    permuted_neurons = Generator(PCG64(seed)).permutation(total_neurons)
+    groups = []
+    for group in (0, 1):
+        dataset = ca_movie_decoding.AllenCaMoviesDisjointDataset.__new__(
+            ca_movie_decoding.AllenCaMoviesDisjointDataset)
+        dataset.seed = seed
+        dataset.group = group
+        dataset.num_neurons = num_neurons
+        neurons_indices = dataset._sample_neurons(pseudo_mice)
+        expected = np.array_split(permuted_neurons, 2)[group][:num_neurons]
+        assert np.array_equal(neurons_indices, np.sort(expected))
+        groups.append(neurons_indices)
+    assert len(np.intersect1d(*groups)) == 0
+
+
+@pytest.mark.parametrize("num_neurons,num_frames,n_components",
+                         [[10, 500, 4], [40, 300, 32], [8, 100, 32]])
+def test_allen_principal_components(num_neurons, num_frames, n_components):
+    from sklearn.decomposition import PCA
+
+    from cebra.datasets.allen import helper
+
+    rng = np.random.default_rng(0)
+    neural = (rng.random((num_neurons, num_frames)) * rng.random(
+        (num_neurons, 1)) * 5).astype(np.float32)
+
+    projection = helper.principal_components(neural,
+                                             n_components=n_components,
+                                             seed=0)
+    n_components = min(n_components, num_neurons)
+    expected = PCA().fit_transform(neural.T)[:, :n_components]
+    assert projection.shape == expected.shape
+    ## Including the signs of the components
+    assert np.allclose(projection, expected, atol=1e-4, rtol=1e-3)
+
+
+@pytest.mark.parametrize("left,right", [[0, 1], [1, 1], [5, 5], [4, 6], [5, 6]])
+@pytest.mark.parametrize("contiguous", [True, False])
+def test_allen_gather_windows(left, right, contiguous):
+    from cebra.datasets.allen import helper
+
+    neural = torch.randn(100, 7)
+    if not contiguous:
+        neural = neural.T.contiguous().T
+    dataset = cebra.data.TensorDataset(neural,
+                                       continuous=torch.zeros(len(neural), 1))
+    dataset.offset = cebra.data.Offset(left, right)
+
+    ## Include indices clamped at both borders of the data
+    index = torch.tensor([0, 1, left, 50, 99 - right, 98, 99])
+    windows = helper.gather_windows(neural, index, dataset.offset)
+    expected = neural[dataset.expand_index(index)].transpose(2, 1)
+    assert windows.shape == (len(index), neural.shape[1], left + right)
+    assert windows.is_contiguous()
+    assert torch.equal(windows, expected)
+
+
 try:
     options = cebra.datasets.get_options("*")
     multisubject_options = cebra.datasets.get_options(
@@ -151,9 +323,8 @@ except:
 
 
 @pytest.mark.requires_dataset
-@pytest.mark.parametrize("options",
-                         cebra.datasets.get_options("*",
-                                                    expand_parametrized=False))
+@pytest.mark.parametrize(
+    "options", cebra.datasets.get_options("*", expand_parametrized=False))
 def test_options(options):
     assert len(options) > 0
     assert len(multisubject_options) > 0